@@ -9,17 +9,29 @@ INSTALLATION (copie-colle dans ton terminal) :
 
 LANCER :
     python vehicle_counter_gui.py
+    python vehicle_counter_gui.py --serve 8080              # + flux web
+    python vehicle_counter_gui.py --headless --serve 8080   # sans Tkinter
+    python vehicle_counter_gui.py --soak 24                 # test d'endurance
+    python vehicle_counter_gui.py --soak 24 --soak-gui      # idem via le dashboard
+    python vehicle_counter_gui.py --tiles 3x2 --tile-region 0.3:0.9
+    python vehicle_counter_gui.py --tile-bench --source cam4k.mp4
+    python vehicle_counter_gui.py --tune --source cam1.mp4 --profile cam1.json
+    python vehicle_counter_gui.py --profile cam1.json      # réglages optimisés
 """
 
-import tkinter as tk
-from tkinter import ttk, font
+import argparse
+import gc
+import json
+import os
+import random
+from types import SimpleNamespace
 import cv2
 import time
 import threading
 import numpy as np
 from collections import defaultdict, deque
 from datetime import datetime
-from PIL import Image, ImageTk
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from ultralytics import YOLO
 
 # ═══════════════════════════════════════════════════════════
@@ -27,8 +39,61 @@ from ultralytics import YOLO
 # ═══════════════════════════════════════════════════════════
 SOURCE        = 0        # 0 = webcam | "video.mp4" = fichier
 CONF_THRESH   = 0.35
+IOU_THRESH    = 0.45
 IMGSZ         = 416
 LINE_RATIO    = 0.55
+MODEL_PATH    = "yolo26s.pt"
+DEVICE        = None     # None = auto | "cpu" | "cuda:0"
+THREADS       = None     # None = défaut torch/OpenCV | nombre de threads CPU
+PROFILE_PATH  = "vehicle_counter_profile.json"   # chargé au démarrage s'il existe
+TRACK_TTL     = 150      # frames sans détection avant d'oublier un ID
+LOG_MAX_LINES = 500      # lignes conservées dans le journal
+
+# Inférence par tuiles (caméras haute résolution)
+TILES         = None     # None = frame entier | (colonnes, lignes), ex. (3, 2)
+TILE_OVERLAP  = 0.20     # recouvrement entre tuiles voisines
+TILE_REGION   = None     # None = frame entier | (haut, bas) en ratios, ex. (0.3, 0.9)
+TILE_MERGE    = 0.60     # intersection / petite boîte au-delà de laquelle on fusionne
+TILE_BENCH_LAYOUTS = [(1, 1), (2, 1), (2, 2), (3, 2), (3, 3), (4, 3)]
+TILE_BENCH_FRAMES  = 60
+
+# Tracker utilisé en mode tuiles (valeurs de bytetrack.yaml)
+TRACKER_ARGS = dict(
+    tracker_type="bytetrack", track_high_thresh=0.25, track_low_thresh=0.1,
+    new_track_thresh=0.25, track_buffer=30, match_thresh=0.8, fuse_score=True,
+)
+
+# Test d'endurance (soak) — trafic synthétique + détecteur factice
+SOAK_FPS                = 25     # cadence simulée de la caméra
+SOAK_SAMPLE_MINUTES     = 10     # minutes simulées entre deux mesures
+SOAK_WARMUP             = 0.10   # fraction initiale ignorée pour les tendances
+SOAK_MAX_RSS_GROWTH_MB  = 16     # dérive max tolérée de la RSS (Mo)
+SOAK_MAX_OBJECTS_GROWTH = 5000   # dérive max tolérée des objets suivis par gc
+SOAK_MAX_STRUCT_GROWTH  = 200    # entrées : tracked/crossed_ids, journal, files
+SOAK_MAX_LATENCY_GROWTH = 0.25   # latence médiane : échec si +25 %...
+SOAK_MIN_LATENCY_DRIFT_MS = 0.5  # ... ET +0.5 ms (sous ce seuil : bruit)
+
+# Auto-réglage (--tune) : grille balayée et exigences
+TUNABLE          = ("IMGSZ", "CONF_THRESH", "IOU_THRESH", "THREADS", "MODEL_PATH", "DEVICE")
+TUNE_TARGET_FPS  = 15
+TUNE_FRAMES      = 120
+TUNE_GRID = dict(
+    IMGSZ       = [320, 416, 512, 640],
+    CONF_THRESH = [0.25, 0.35, 0.45],
+    IOU_THRESH  = [0.45, 0.60],
+    THREADS     = [None],               # None = défaut torch ; + tous les cœurs
+)
+TUNE_BACKENDS    = [MODEL_PATH, "yolo26s.onnx", "yolo26s_openvino_model"]
+TUNE_REFERENCE   = dict(IMGSZ=960, CONF_THRESH=0.25, IOU_THRESH=0.45)
+TUNE_MIN_CROSSINGS = 5    # en dessous, l'accord se calcule sur les boîtes suivies
+
+# Serveur HTTP (flux MJPEG + stats JSON / SSE)
+HTTP_HOST       = "127.0.0.1"   # pas d'authentification : local par défaut
+STREAM_MAX_FPS  = 10      # cadence max d'encodage JPEG (partagée par tous)
+JPEG_QUALITY    = 80
+CLIENT_TIMEOUT  = 2.0     # s — un client trop lent est déconnecté
+SSE_INTERVAL    = 0.5     # s — intervalle min entre deux événements SSE
+KEEPALIVE       = 5.0     # s sans nouveauté → keep-alive (détecte les clients partis)
 
 VEHICLE_CLASSES = {2: "Car", 3: "Motorcycle", 5: "Bus", 7: "Truck"}
 ICONS  = {"Car": "🚗", "Motorcycle": "🏍", "Bus": "🚌", "Truck": "🚛"}
@@ -58,11 +123,1151 @@ MUTED     = "#4a5568"
 ACCENT    = "#00d4ff"
 
 
+# ═══════════════════════════════════════════════════════════
+#  INFÉRENCE PAR TUILES + FUSION AUX JOINTURES
+# ═══════════════════════════════════════════════════════════
+class _Tensor:
+    """Imite l'API ``.cpu().numpy()`` des tenseurs Ultralytics."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+
+class _Boxes:
+    def __init__(self, xyxy, ids, cls, conf):
+        self.xyxy = _Tensor(xyxy)
+        self.id   = _Tensor(ids) if len(ids) else None
+        self.cls  = _Tensor(cls)
+        self.conf = _Tensor(conf)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def tile_spans(length, n, overlap):
+    """Découpe ``[0, length)`` en ``n`` segments égaux qui se chevauchent."""
+    if n <= 1:
+        return [(0, length)]
+    size = int(np.ceil(length / (n - (n - 1) * overlap)))
+    step = (length - size) / (n - 1)
+    return [(int(round(i * step)), int(round(i * step)) + size) for i in range(n)]
+
+
+def tile_grid(width, height, cols, rows, overlap=TILE_OVERLAP, region=None):
+    """Rectangles ``(x0, y0, x1, y1)`` des tuiles, limités à la bande
+    verticale ``region`` (ratios haut/bas) si elle est donnée."""
+    top, bottom = 0, height
+    if region:
+        top, bottom = int(height * region[0]), int(height * region[1])
+    return [(x0, top + y0, x1, top + y1)
+            for y0, y1 in tile_spans(bottom - top, rows, overlap)
+            for x0, x1 in tile_spans(width, cols, overlap)]
+
+
+def merge_tile_boxes(xyxy, confs, classes, tile_idx, thresh=TILE_MERGE):
+    """NMS entre tuiles : une boîte est supprimée si une boîte plus sûre de
+    même classe, venant d'une AUTRE tuile, la recouvre à plus de ``thresh``
+    (intersection / aire de la plus petite — une voiture coupée par une
+    jointure n'a qu'un faible IoU avec sa version entière).
+
+    Retourne les indices conservés. Dans une même tuile, le NMS du modèle
+    a déjà été appliqué.
+    """
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    order = confs.argsort()[::-1]
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        iw = np.minimum(xyxy[i, 2], xyxy[rest, 2]) - np.maximum(xyxy[i, 0], xyxy[rest, 0])
+        ih = np.minimum(xyxy[i, 3], xyxy[rest, 3]) - np.maximum(xyxy[i, 1], xyxy[rest, 1])
+        inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+        ios = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        dup = (ios > thresh) & (classes[rest] == classes[i]) & (tile_idx[rest] != tile_idx[i])
+        order = rest[~dup]
+    return np.array(keep, dtype=int)
+
+
+class TiledDetector:
+    """Même interface que ``YOLO.track`` mais par tuiles : le frame (ou la
+    bande de comptage) est découpé en tuiles qui se chevauchent, inférées
+    en un seul batch, puis les boîtes sont fusionnées aux jointures avant
+    d'être passées au tracker ByteTrack d'Ultralytics.
+    """
+
+    def __init__(self, model, cols, rows, overlap=TILE_OVERLAP, region=None):
+        from ultralytics.engine.results import Boxes
+        from ultralytics.trackers.byte_tracker import BYTETracker
+
+        self.model   = model
+        self.cols    = cols
+        self.rows    = rows
+        self.overlap = overlap
+        self.region  = region
+        self._Boxes  = Boxes
+        self.tracker = BYTETracker(SimpleNamespace(**TRACKER_ARGS))
+
+    @property
+    def tile_count(self):
+        return self.cols * self.rows
+
+    def detect(self, frame, conf, iou, imgsz, classes, device=None):
+        """Détections fusionnées ``(N, 6)`` : x1, y1, x2, y2, conf, cls."""
+        h, w = frame.shape[:2]
+        tiles = tile_grid(w, h, self.cols, self.rows, self.overlap, self.region)
+        crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+        results = self.model.predict(crops, conf=conf, iou=iou, imgsz=imgsz,
+                                     classes=classes, device=device, verbose=False)
+
+        parts, owners = [], []
+        for k, ((x0, y0, _, _), res) in enumerate(zip(tiles, results)):
+            if res.boxes is None or len(res.boxes) == 0:
+                continue
+            b = res.boxes.data.cpu().numpy()[:, :6].copy()
+            b[:, [0, 2]] += x0
+            b[:, [1, 3]] += y0
+            parts.append(b)
+            owners.append(np.full(len(b), k))
+        if not parts:
+            return np.zeros((0, 6), np.float32)
+
+        dets, owners = np.concatenate(parts), np.concatenate(owners)
+        keep = merge_tile_boxes(dets[:, :4], dets[:, 4], dets[:, 5], owners)
+        return dets[keep]
+
+    def track(self, frame, conf=None, iou=None, imgsz=None,
+              classes=None, device=None, **kwargs):
+        # Défauts lus à l'appel : un profil chargé au démarrage les remplace
+        dets = self.detect(frame,
+                           CONF_THRESH if conf is None else conf,
+                           IOU_THRESH if iou is None else iou,
+                           imgsz or IMGSZ, classes,
+                           DEVICE if device is None else device)
+        tracks = self.tracker.update(self._Boxes(dets, frame.shape[:2]), frame)
+        tracks = np.asarray(tracks, np.float32).reshape(-1, 8)
+        # Colonnes ByteTrack : x1, y1, x2, y2, id, score, cls, idx
+        return [_Result(_Boxes(tracks[:, :4], tracks[:, 4],
+                               tracks[:, 6], tracks[:, 5]))]
+
+
+# ═══════════════════════════════════════════════════════════
+#  MOTEUR DE COMPTAGE (indépendant de l'interface)
+# ═══════════════════════════════════════════════════════════
+class CounterEngine:
+    """Détection + tracking + comptage sur une suite de frames.
+
+    Utilisé aussi bien par le dashboard Tkinter que par le mode headless.
+    """
+
+    def __init__(self, model=None):
+        self.model        = model
+        self.counts       = defaultdict(int)
+        self.tracked_ids  = {}
+        self.crossed_ids  = set()
+        self.last_seen    = {}
+        self.fps_history  = deque(maxlen=30)
+        self.prev_time    = time.time()
+        self.current_fps  = 0.0
+        self.frame_count  = 0
+
+    def load_model(self, path=None):
+        self.model = YOLO(path or MODEL_PATH)
+        if TILES:
+            self.model = TiledDetector(self.model, *TILES, region=TILE_REGION)
+
+    def reset(self):
+        self.counts.clear()
+        self.tracked_ids.clear()
+        self.crossed_ids.clear()
+        self.last_seen.clear()
+        self.fps_history.clear()
+        self.prev_time   = time.time()
+        self.current_fps = 0.0
+
+    def stats(self):
+        """Instantané JSON-sérialisable des compteurs et du FPS."""
+        counts = {vtype: self.counts[vtype] for vtype in VEHICLE_CLASSES.values()}
+        return {
+            "counts": counts,
+            "total":  sum(counts.values()),
+            "fps":    round(self.current_fps, 2),
+            "frames": self.frame_count,
+            "time":   datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def process(self, frame):
+        """Traite un frame (annoté en place).
+
+        Retourne la liste des franchissements ``(label, tid, total)``.
+        """
+        h, w = frame.shape[:2]
+        line_y = int(h * LINE_RATIO)
+        events = []
+
+        # ── Inférence YOLO ──
+        results = self.model.track(
+            frame,
+            persist=True,
+            conf=CONF_THRESH,
+            iou=IOU_THRESH,
+            imgsz=IMGSZ,
+            classes=list(VEHICLE_CLASSES.keys()),
+            device=DEVICE,
+            verbose=False
+        )
+
+        if (results[0].boxes is not None
+                and results[0].boxes.id is not None):
+            boxes   = results[0].boxes.xyxy.cpu().numpy()
+            ids     = results[0].boxes.id.cpu().numpy().astype(int)
+            classes = results[0].boxes.cls.cpu().numpy().astype(int)
+            confs   = results[0].boxes.conf.cpu().numpy()
+
+            for box, tid, cls_id, conf in zip(boxes, ids, classes, confs):
+                label = VEHICLE_CLASSES.get(cls_id)
+                if not label:
+                    continue
+
+                color = COLORS_BGR[label]
+                x1, y1, x2, y2 = map(int, box)
+                cx, cy = (x1+x2)//2, int(y2)
+
+                # Franchissement ligne
+                side = "above" if cy < line_y else "below"
+                self.last_seen[tid] = self.frame_count
+                if tid not in self.tracked_ids:
+                    self.tracked_ids[tid] = side
+                else:
+                    if (self.tracked_ids[tid] != side
+                            and tid not in self.crossed_ids):
+                        self.counts[label] += 1
+                        self.crossed_ids.add(tid)
+                        events.append((label, tid, self.counts[label]))
+                    self.tracked_ids[tid] = side
+
+                # Dessin bbox
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+                tag = f"{label} #{tid}  {conf:.0%}"
+                (tw, th), _ = cv2.getTextSize(tag, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+                cv2.rectangle(frame, (x1, y1-th-8), (x1+tw+6, y1), color, -1)
+                cv2.putText(frame, tag, (x1+3, y1-4),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 1, cv2.LINE_AA)
+                cv2.circle(frame, (cx, cy), 4, color, -1)
+
+        # Ligne de comptage
+        cv2.line(frame, (0, line_y), (w, line_y), (0, 60, 255), 2)
+        cv2.putText(frame, "COUNTING LINE", (w//2-80, line_y-8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 80, 255), 1, cv2.LINE_AA)
+
+        # FPS
+        now = time.time()
+        fps = 1.0 / max(now - self.prev_time, 1e-6)
+        self.prev_time = now
+        self.current_fps = fps
+        self.fps_history.append(fps)
+        self.frame_count += 1
+        if self.frame_count % TRACK_TTL == 0:
+            self._forget_stale()
+
+        cv2.putText(frame, f"FPS: {fps:.1f}", (12, 28),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,136), 2, cv2.LINE_AA)
+
+        return events
+
+    def _forget_stale(self):
+        """Oublie les IDs disparus depuis TRACK_TTL frames (sinon
+        ``tracked_ids`` / ``crossed_ids`` grossissent indéfiniment)."""
+        limit = self.frame_count - TRACK_TTL
+        for tid in [t for t, seen in self.last_seen.items() if seen < limit]:
+            del self.last_seen[tid]
+            self.tracked_ids.pop(tid, None)
+            self.crossed_ids.discard(tid)
+
+
+def crossing_message(label, tid, total):
+    return f"{ICONS[label]} {label} #{tid} → Total : {total}"
+
+
+# ═══════════════════════════════════════════════════════════
+#  SERVEUR HTTP : FLUX MJPEG + STATS JSON / SSE
+# ═══════════════════════════════════════════════════════════
+class StreamBroadcaster:
+    """Encode chaque frame en JPEG une seule fois (cadence plafonnée) et
+    partage les mêmes octets entre tous les clients connectés.
+
+    Aucun tampon par client : un client en retard saute simplement les
+    frames intermédiaires, et celui qui bloque l'écriture plus de
+    ``CLIENT_TIMEOUT`` secondes est déconnecté. Sans spectateur MJPEG,
+    rien n'est encodé : ``/snapshot.jpg`` encode alors à la demande.
+    """
+
+    def __init__(self, max_fps=STREAM_MAX_FPS, quality=JPEG_QUALITY):
+        self.max_fps  = max_fps
+        self.quality  = quality
+        self.clients  = 0        # flux ouverts (MJPEG + SSE)
+        self.viewers  = 0        # flux MJPEG : eux seuls déclenchent l'encodage
+        self._closed  = False
+        self._params  = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+        # Détection → encodeur (seul le dernier frame est conservé)
+        self._pending      = None
+        self._latest       = None     # dernier frame brut, pour /snapshot.jpg
+        self._published    = 0
+        self._pending_cond = threading.Condition()
+
+        # Encodeur → clients
+        self._jpeg       = None
+        self._jpeg_of    = 0          # numéro de publication du frame encodé
+        self._stats      = {}
+        self._seq        = 0          # JPEG encodés
+        self._stats_seq  = 0          # stats publiées
+        self._jpeg_cond  = threading.Condition()
+
+        threading.Thread(target=self._encode_loop, daemon=True).start()
+
+    # ── Côté détection ───────────────────────────────────
+    def publish(self, frame, stats):
+        """Dépose le dernier frame annoté ; ne bloque jamais la détection."""
+        with self._pending_cond:
+            self._published += 1
+            self._latest = frame
+            if self.viewers:
+                self._pending = (self._published, frame)
+                self._pending_cond.notify()
+        with self._jpeg_cond:
+            self._stats = stats
+            self._stats_seq += 1
+            self._jpeg_cond.notify_all()
+
+    def depth(self):
+        """Frames en attente d'encodage (0 ou 1 : seul le dernier est gardé)."""
+        with self._pending_cond:
+            return int(self._pending is not None)
+
+    def close(self):
+        self._closed = True
+        with self._pending_cond:
+            self._pending_cond.notify_all()
+        with self._jpeg_cond:
+            self._jpeg_cond.notify_all()
+
+    def _encode_loop(self):
+        interval = 1.0 / self.max_fps
+        last = 0.0
+
+        while not self._closed:
+            delay = last + interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self._pending_cond:
+                while self._pending is None and not self._closed:
+                    self._pending_cond.wait()
+                item, self._pending = self._pending, None
+            if item is None:
+                break
+
+            last = time.monotonic()
+            published, frame = item
+            ok, buf = cv2.imencode(".jpg", frame, self._params)
+            if not ok:
+                continue
+            with self._jpeg_cond:
+                self._jpeg = buf.tobytes()
+                self._jpeg_of = published
+                self._seq += 1
+                self._jpeg_cond.notify_all()
+
+    # ── Côté clients ─────────────────────────────────────
+    def stats(self):
+        with self._jpeg_cond:
+            return dict(self._stats, clients=self.clients)
+
+    def snapshot_jpeg(self):
+        """JPEG du dernier frame : celui de l'encodeur s'il est à jour,
+        sinon encodé à la demande. ``None`` si aucun frame n'a été publié."""
+        with self._pending_cond:
+            frame, published = self._latest, self._published
+        with self._jpeg_cond:
+            if self._jpeg is not None and self._jpeg_of == published:
+                return self._jpeg
+        if frame is None:
+            return None
+        ok, buf = cv2.imencode(".jpg", frame, self._params)
+        return buf.tobytes() if ok else None
+
+    def wait_frame(self, last_seq, timeout=None):
+        """Attend un JPEG plus récent que ``last_seq``.
+
+        Retourne ``(seq, jpeg)``, ``(last_seq, None)`` si ``timeout`` expire
+        (détection à l'arrêt), ou ``None`` si le serveur s'arrête.
+        """
+        with self._jpeg_cond:
+            ready = self._jpeg_cond.wait_for(
+                lambda: self._closed or self._seq > last_seq, timeout)
+            if self._closed:
+                return None
+            if not ready:
+                return last_seq, None
+            return self._seq, self._jpeg
+
+    def wait_stats(self, last_seq, timeout=None):
+        """Comme ``wait_frame`` pour les stats : ``(seq, stats)``."""
+        with self._jpeg_cond:
+            ready = self._jpeg_cond.wait_for(
+                lambda: self._closed or self._stats_seq > last_seq, timeout)
+            if self._closed:
+                return None
+            if not ready:
+                return last_seq, None
+            return self._stats_seq, dict(self._stats, clients=self.clients)
+
+    def client_enter(self, video=False):
+        with self._jpeg_cond:
+            self.clients += 1
+        if video:
+            with self._pending_cond:
+                self.viewers += 1
+
+    def client_leave(self, video=False):
+        with self._jpeg_cond:
+            self.clients -= 1
+        if video:
+            with self._pending_cond:
+                self.viewers -= 1
+
+
+INDEX_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Vehicle Counter</title>
+<style>
+ body {{ background:{bg}; color:{text}; font-family:Helvetica,sans-serif; margin:24px; }}
+ h1 {{ color:{accent}; font-size:20px; }}
+ img {{ max-width:100%; border:1px solid {border}; }}
+ pre {{ background:{surface}; padding:12px; }}
+</style></head>
+<body>
+ <h1>🚗 VEHICLE COUNTER</h1>
+ <img src="/stream.mjpg" alt="flux">
+ <pre id="stats">En attente des statistiques...</pre>
+ <script>
+  new EventSource("/events").onmessage = function (e) {{
+    document.getElementById("stats").textContent =
+      JSON.stringify(JSON.parse(e.data), null, 2);
+  }};
+ </script>
+</body></html>
+""".format(bg=BG, text=TEXT, accent=ACCENT, border=BORDER, surface=SURFACE)
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """Routes :
+        /              page de visualisation
+        /stream.mjpg   flux MJPEG (multipart/x-mixed-replace)
+        /snapshot.jpg  dernier frame encodé
+        /stats         compteurs + FPS en JSON
+        /events        compteurs + FPS en server-sent events
+    """
+
+    timeout = CLIENT_TIMEOUT
+
+    def do_GET(self):
+        routes = {
+            "/":             self._index,
+            "/stream.mjpg":  self._mjpeg,
+            "/snapshot.jpg": self._snapshot,
+            "/stats":        self._stats,
+            "/events":       self._events,
+        }
+        route = routes.get(self.path.split("?", 1)[0])
+        if route is None:
+            self.send_error(404)
+            return
+        try:
+            route()
+        except OSError:
+            # Client parti ou trop lent : on le lâche sans rien tamponner
+            self.close_connection = True
+
+    def log_message(self, fmt, *args):
+        pass
+
+    @property
+    def broadcaster(self):
+        return self.server.broadcaster
+
+    def _send_body(self, body, ctype):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _index(self):
+        self._send_body(INDEX_HTML.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _stats(self):
+        stats = self.broadcaster.stats()
+        self._send_body(json.dumps(stats).encode("utf-8"), "application/json")
+
+    def _snapshot(self):
+        jpeg = self.broadcaster.snapshot_jpeg()
+        if jpeg is None:
+            self.send_error(503, "Aucun frame disponible")
+            return
+        self._send_body(jpeg, "image/jpeg")
+
+    def _stream(self, ctype, wait, write_item, keep_alive, video=False,
+                min_interval=0.0):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        b = self.broadcaster
+        b.client_enter(video)
+        try:
+            seq = 0
+            while True:
+                item = wait(seq, KEEPALIVE)
+                if item is None:
+                    return
+                seq, payload = item
+                if payload is None:
+                    # Rien de neuf (détection arrêtée) : écrire quand même
+                    # pour repérer les sockets mortes
+                    keep_alive()
+                    continue
+                write_item(payload)
+                if min_interval:
+                    time.sleep(min_interval)
+        finally:
+            b.client_leave(video)
+
+    def _mjpeg(self):
+        def write(jpeg):
+            self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                             b"Content-Length: %d\r\n\r\n" % len(jpeg))
+            self.wfile.write(jpeg)
+            self.wfile.write(b"\r\n")
+
+        def keep_alive():
+            jpeg = self.broadcaster.snapshot_jpeg()
+            if jpeg is None:
+                self.wfile.write(b"\r\n")
+            else:
+                write(jpeg)
+
+        self._stream("multipart/x-mixed-replace; boundary=frame",
+                     self.broadcaster.wait_frame, write, keep_alive, video=True)
+
+    def _events(self):
+        def write(stats):
+            self.wfile.write(f"data: {json.dumps(stats)}\n\n".encode("utf-8"))
+
+        def keep_alive():
+            self.wfile.write(b": keep-alive\n\n")
+
+        self._stream("text/event-stream", self.broadcaster.wait_stats, write,
+                     keep_alive, min_interval=SSE_INTERVAL)
+
+
+class StreamServer(ThreadingHTTPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, port, host=HTTP_HOST, broadcaster=None):
+        self.broadcaster = broadcaster or StreamBroadcaster()
+        super().__init__((host, port), StreamHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{'localhost' if host == '0.0.0.0' else host}:{port}/"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.broadcaster.close()
+        self.shutdown()
+        self.server_close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  TEST D'ENDURANCE (SOAK) : MÉMOIRE & LATENCE SUR DES JOURS
+# ═══════════════════════════════════════════════════════════
+class SyntheticTraffic:
+    """Source vidéo infinie + détecteur factice.
+
+    Des véhicules descendent la route et traversent la ligne de comptage ;
+    chacun reçoit un nouvel ID, comme avec un vrai tracker. L'objet expose
+    ``read()`` (comme ``cv2.VideoCapture``) et ``track()`` (comme ``YOLO``).
+    """
+
+    SIZES = {2: (40, 30), 3: (16, 24), 5: (56, 70), 7: (50, 60)}
+
+    def __init__(self, width=320, height=240, seed=0):
+        self.width    = width
+        self.height   = height
+        self.rng      = random.Random(seed)
+        self.next_id  = 1
+        self.vehicles = []       # [tid, cls, x, y, vitesse]
+        self.crossed  = 0        # vérité terrain pour le comptage
+        self.line_y   = int(height * LINE_RATIO)
+        self.road     = np.full((height, width, 3), 60, np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def read(self):
+        if self.rng.random() < 0.08:
+            cls = self.rng.choice(list(VEHICLE_CLASSES))
+            x = self.rng.randrange(0, self.width - self.SIZES[cls][0])
+            self.vehicles.append([self.next_id, cls, x, 0.0,
+                                  self.rng.uniform(2.0, 6.0)])
+            self.next_id += 1
+
+        alive = []
+        for v in self.vehicles:
+            h = self.SIZES[v[1]][1]
+            before = v[3] + h < self.line_y
+            v[3] += v[4]
+            if before and v[3] + h >= self.line_y:
+                self.crossed += 1
+            if v[3] < self.height:
+                alive.append(v)
+        self.vehicles = alive
+
+        frame = self.road.copy()
+        for tid, cls, x, y, _ in self.vehicles:
+            w, h = self.SIZES[cls]
+            cv2.rectangle(frame, (x, int(y)), (x + w, int(y) + h), (200, 200, 200), -1)
+        return True, frame
+
+    def track(self, frame, **kwargs):
+        n = len(self.vehicles)
+        xyxy = np.zeros((n, 4), np.float32)
+        for i, (tid, cls, x, y, _) in enumerate(self.vehicles):
+            w, h = self.SIZES[cls]
+            xyxy[i] = (x, y, x + w, y + h)
+        ids  = np.array([v[0] for v in self.vehicles], np.float32)
+        cls  = np.array([v[1] for v in self.vehicles], np.float32)
+        conf = np.full(n, 0.9, np.float32)
+        return [_Result(_Boxes(xyxy, ids, cls, conf))]
+
+
+def rss_mb():
+    """Mémoire résidente actuelle (Linux) ; sinon pic via ``resource``."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SoakSource:
+    """Enveloppe ``SyntheticTraffic`` côté capture : mesure le temps passé
+    par la boucle de détection entre deux lectures (latence par frame, hors
+    génération du trafic synthétique)."""
+
+    def __init__(self, traffic):
+        self.traffic   = traffic
+        self.latencies = []
+        self._done     = None
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def read(self):
+        now = time.perf_counter()
+        if self._done is not None:
+            self.latencies.append(now - self._done)
+        ret, frame = self.traffic.read()
+        self._done = time.perf_counter()
+        return ret, frame
+
+    def take_latencies(self):
+        latencies, self.latencies = self.latencies, []
+        return sorted(latencies) or [0.0]
+
+
+def window_growth(values):
+    """``(début, dérive)`` : médiane du premier tiers et écart avec celle du
+    dernier tiers — insensible aux pics isolés, contrairement à une pente."""
+    k = max(len(values) // 3, 1)
+    first = sorted(values[:k])[k // 2]
+    last = sorted(values[-k:])[k // 2]
+    return first, last - first
+
+
+def run_soak(hours, server=None, gui=False):
+    """Fait tourner la chaîne complète sur ``hours`` heures simulées.
+
+    Sans ``gui`` : moteur + encodeur du serveur, boucle pilotée ici.
+    Avec ``gui`` : le vrai ``VehicleCounterApp`` (boucle de détection,
+    journal Tkinter, callbacks ``root.after``) — nécessite un affichage,
+    ex. ``xvfb-run``.
+
+    Retourne 0 si mémoire, structures, files et latence restent stables.
+    """
+    traffic = SyntheticTraffic()
+    source = SoakSource(traffic)
+    broadcaster = server.broadcaster if server else StreamBroadcaster()
+    broadcaster.client_enter(video=True)    # spectateur fictif : l'encodeur tourne
+
+    total_frames = int(hours * 3600 * SOAK_FPS)
+    sample_every = max(int(SOAK_SAMPLE_MINUTES * 60 * SOAK_FPS), 1)
+    samples = []
+
+    root = app = None
+    if gui:
+        import_gui()
+        root = tk.Tk()
+        app = VehicleCounterApp(root, broadcaster, model=traffic)
+        engine = app.engine
+    else:
+        engine = CounterEngine(model=traffic)
+
+    def take_sample(frame_no):
+        latencies = source.take_latencies()
+        sample = {
+            "hours":   frame_no / SOAK_FPS / 3600,
+            "rss":     rss_mb(),
+            "objects": len(gc.get_objects()),
+            "tracked": len(engine.tracked_ids),
+            "crossed": len(engine.crossed_ids),
+            "log":     app.log_lines() if app else None,
+            "enc_q":   broadcaster.depth(),
+            "tk_q":    len(root.tk.splitlist(root.tk.call("after", "info"))) if root else None,
+            "p50":     latencies[len(latencies) // 2] * 1000,
+            "p95":     latencies[int(len(latencies) * 0.95)] * 1000,
+        }
+        samples.append(sample)
+        cells = [f"{sample['hours']:7.2f}", f"{sample['rss']:8.1f}",
+                 f"{sample['objects']:9d}", f"{sample['tracked']:8d}",
+                 f"{sample['crossed']:8d}"]
+        cells += [f"{'-' if sample[k] is None else sample[k]:>{w}}"
+                  for k, w in (("log", 5), ("enc_q", 5), ("tk_q", 5))]
+        cells += [f"{sample['p50']:7.3f}", f"{sample['p95']:7.3f}"]
+        print(" ".join(cells))
+
+    mode = "dashboard Tkinter" if gui else "moteur headless"
+    print(f"🧪 Soak ({mode}) : {hours:g} h simulées "
+          f"({total_frames} frames à {SOAK_FPS} FPS)")
+    print(f"{'h sim':>7} {'RSS Mo':>8} {'objets':>9} {'tracked':>8} "
+          f"{'crossed':>8} {'log':>5} {'f.enc':>5} {'f.tk':>5} "
+          f"{'p50 ms':>7} {'p95 ms':>7}")
+
+    t0 = time.time()
+    if gui:
+        app.cap = source
+        app.running = True
+        worker = threading.Thread(target=app._detect_loop, daemon=True)
+        worker.start()
+        next_sample = sample_every
+        while engine.frame_count < total_frames:
+            root.update()
+            if engine.frame_count >= next_sample:
+                take_sample(next_sample)
+                next_sample += sample_every
+        app.running = False
+        while worker.is_alive():
+            root.update()
+        root.destroy()
+    else:
+        for i in range(1, total_frames + 1):
+            ret, frame = source.read()
+            engine.process(frame)
+            broadcaster.publish(frame, engine.stats())
+            if i % sample_every == 0:
+                take_sample(i)
+
+    broadcaster.client_leave(video=True)
+    if not server:
+        broadcaster.close()
+
+    frames = engine.frame_count
+    elapsed = time.time() - t0
+    counted = sum(engine.counts.values())
+    print(f"\n⏱ {frames} frames en {elapsed:.0f} s "
+          f"(×{frames / SOAK_FPS / max(elapsed, 1e-9):.0f} temps réel)")
+    print(f"🚗 Comptés : {counted}  |  Attendus : {traffic.crossed}")
+
+    steady = samples[int(len(samples) * SOAK_WARMUP):]
+    if len(steady) < 3:
+        print("⚠ Pas assez de mesures pour une tendance — allonge la durée.")
+        return 1
+
+    checks = [
+        # nom, clé, dérive absolue max, dérive relative max (None = absolue seule)
+        ("RSS (Mo)",        "rss",     SOAK_MAX_RSS_GROWTH_MB,    None),
+        ("Objets Python",   "objects", SOAK_MAX_OBJECTS_GROWTH,   None),
+        ("tracked_ids",     "tracked", SOAK_MAX_STRUCT_GROWTH,    None),
+        ("crossed_ids",     "crossed", SOAK_MAX_STRUCT_GROWTH,    None),
+        ("Journal",         "log",     SOAK_MAX_STRUCT_GROWTH,    None),
+        ("File encodeur",   "enc_q",   SOAK_MAX_STRUCT_GROWTH,    None),
+        ("File Tk",         "tk_q",    SOAK_MAX_STRUCT_GROWTH,    None),
+        ("Latence p50 (ms)", "p50",    SOAK_MIN_LATENCY_DRIFT_MS, SOAK_MAX_LATENCY_GROWTH),
+    ]
+    failed = counted != traffic.crossed
+    for name, key, limit, rel_limit in checks:
+        if steady[0][key] is None:
+            continue
+        first, growth = window_growth([s[key] for s in steady])
+        rel = growth / max(abs(first), 1e-9)
+        ok = growth <= limit or (rel_limit is not None and rel <= rel_limit)
+        failed |= not ok
+        rule = f"max +{limit:g}" + (f" et +{rel_limit:.0%}" if rel_limit else "")
+        print(f"{'✅' if ok else '❌'} {name:<17} dérive {growth:+.3g} "
+              f"({rel:+.1%}) — {rule}")
+
+    print("❌ ÉCHEC du soak" if failed else "✅ Soak réussi")
+    return 1 if failed else 0
+
+
+# ═══════════════════════════════════════════════════════════
+#  BANC DE MESURE : COÛT PAR DISPOSITION DE TUILES
+# ═══════════════════════════════════════════════════════════
+def read_clip(source, frames):
+    """Lit au plus ``frames`` frames de ``source`` en mémoire."""
+    cap = cv2.VideoCapture(source)
+    clip = []
+    while len(clip) < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        clip.append(frame)
+    cap.release()
+    return clip
+
+
+def watch_tracked(engine):
+    """Branche un compteur de boîtes suivies (par classe) sur ``engine``."""
+    tracked = defaultdict(int)
+    track = engine.model.track
+
+    def counting_track(frame, **kwargs):
+        results = track(frame, **kwargs)
+        boxes = results[0].boxes
+        if boxes is not None and boxes.id is not None:
+            for cls_id in boxes.cls.cpu().numpy().astype(int):
+                label = VEHICLE_CLASSES.get(cls_id)
+                if label:
+                    tracked[label] += 1
+        return results
+
+    engine.model = SimpleNamespace(track=counting_track)
+    return tracked
+
+
+def bench_tiles(source, layouts=TILE_BENCH_LAYOUTS, frames=TILE_BENCH_FRAMES,
+                region=TILE_REGION):
+    """Mesure débit et nombre de détections pour chaque disposition de
+    tuiles, sur les mêmes frames de ``source``."""
+    clip = read_clip(source, frames)
+    if not clip:
+        print("❌ Impossible de lire la source !")
+        return 1
+
+    h, w = clip[0].shape[:2]
+    print(f"📐 Source {w}x{h} — {len(clip)} frames, imgsz {IMGSZ}, "
+          f"recouvrement {TILE_OVERLAP:.0%}"
+          + (f", bande {region[0]:.2f}–{region[1]:.2f}" if region else ""))
+    print(f"{'tuiles':>7} {'n':>3} {'FPS':>7} {'ms/frame':>9} {'ms/tuile':>9} "
+          f"{'suivis/frame':>12} {'coût':>6}")
+
+    warmup = min(5, len(clip) - 1)
+    base = None
+    for cols, rows in layouts:
+        # Modèle neuf à chaque ligne, et toujours TiledDetector (même en
+        # 1x1) : même tracker ByteTrack partout, seul le découpage varie
+        detector = TiledDetector(YOLO(MODEL_PATH), cols, rows, region=region)
+        engine = CounterEngine(model=detector)
+        tracked = watch_tracked(engine)
+        for i, frame in enumerate(clip):
+            if i == warmup:
+                start = time.perf_counter()
+                tracked.clear()
+            engine.process(frame.copy())
+        timed = len(clip) - warmup
+        ms = (time.perf_counter() - start) * 1000 / timed
+        base = base or ms
+        n = cols * rows
+        print(f"{cols}x{rows:<5} {n:3d} {1000 / ms:7.1f} {ms:9.1f} {ms / n:9.1f} "
+              f"{sum(tracked.values()) / timed:12.1f} {ms / base:5.1f}x")
+    return 0
+
+
+# ═══════════════════════════════════════════════════════════
+#  AUTO-RÉGLAGE : PROFIL OPTIMAL PAR CAMÉRA
+# ═══════════════════════════════════════════════════════════
+def current_settings():
+    return {key: globals()[key] for key in TUNABLE}
+
+
+def apply_settings(settings):
+    """Remplace les constantes de CONFIG par ``settings`` (clés TUNABLE)."""
+    for key, value in settings.items():
+        if key in TUNABLE:
+            globals()[key] = value
+    if THREADS:
+        import torch
+        torch.set_num_threads(THREADS)
+        cv2.setNumThreads(THREADS)
+
+
+def device_available(device):
+    if device is None or str(device) == "cpu":
+        return True
+    device = str(device)
+    if device.isdigit():
+        device = f"cuda:{device}"
+    import torch
+    if device.startswith("cuda"):
+        index = device.partition(":")[2] or "0"
+        return (index.isdigit() and torch.cuda.is_available()
+                and int(index) < torch.cuda.device_count())
+    if device == "mps":
+        return torch.backends.mps.is_available()
+    return False
+
+
+def load_profile(path=PROFILE_PATH):
+    """Charge un profil écrit par ``--tune`` ; retourne les réglages
+    appliqués, ou ``None`` si le fichier est absent ou illisible (les
+    constantes de CONFIG restent alors en vigueur)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        settings = {k: v for k, v in profile["settings"].items() if k in TUNABLE}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"⚠ Profil {path} illisible ({e!r}) — constantes par défaut.")
+        return None
+
+    # bool est un int pour Python : on compare les types exactement
+    valid = {
+        "IMGSZ":       lambda v: type(v) is int and v > 0 and v % 32 == 0,
+        "CONF_THRESH": lambda v: type(v) is float and 0 < v < 1,
+        "IOU_THRESH":  lambda v: type(v) is float and 0 < v < 1,
+        "THREADS":     lambda v: v is None or (type(v) is int and v >= 1),
+        "MODEL_PATH":  lambda v: type(v) is str,
+        "DEVICE":      lambda v: v is None or type(v) in (str, int),
+    }
+    for key in [k for k in settings if not valid[k](settings[k])]:
+        print(f"⚠ Profil {path} : {key} = {settings.pop(key)!r} "
+              f"invalide — {globals()[key]!r} conservé.")
+    if "MODEL_PATH" in settings and not os.path.exists(settings["MODEL_PATH"]):
+        print(f"⚠ Profil {path} : modèle {settings.pop('MODEL_PATH')} "
+              f"introuvable — {MODEL_PATH} conservé.")
+    if "DEVICE" in settings and not device_available(settings["DEVICE"]):
+        print(f"⚠ Profil {path} : device {settings.pop('DEVICE')} "
+              f"indisponible — {DEVICE or 'auto'} conservé.")
+    apply_settings(settings)
+    return settings
+
+
+def export_imgsz(path):
+    """Taille d'entrée figée d'un export statique (ONNX, OpenVINO…), lue
+    dans ses métadonnées : Ultralytics l'impose à l'inférence quel que
+    soit ``imgsz``. ``None`` si la taille est libre (.pt, export dynamique)."""
+    model = YOLO(path)
+    model.predict(np.zeros((64, 64, 3), np.uint8), device="cpu", verbose=False)
+    backend = model.predictor.model
+    if getattr(backend, "dynamic", False) or not getattr(backend, "imgsz", None):
+        return None
+    return int(max(backend.imgsz))
+
+
+def backend_sizes():
+    """Backends présents de TUNE_BACKENDS → taille figée (``None`` = libre)."""
+    sizes = {}
+    for path in TUNE_BACKENDS:
+        if not os.path.exists(path):
+            continue
+        try:
+            sizes[path] = export_imgsz(path)
+        except Exception as e:
+            print(f"{path:<24} ❌ {e}")
+            continue
+        if sizes[path]:
+            print(f"📐 {path} : export statique, imgsz figé à {sizes[path]}")
+    return sizes
+
+
+def tune_grid(sizes):
+    """Toutes les combinaisons de TUNE_GRID × backends de ``sizes``. Un
+    export statique n'est essayé qu'à sa propre taille : balayer IMGSZ
+    n'y changerait rien et le profil noterait une taille jamais utilisée."""
+    import torch
+
+    # Valeurs explicites : un None ne rétablirait pas le défaut après un essai
+    grid = dict(TUNE_GRID)
+    default = torch.get_num_threads()
+    grid["THREADS"] = sorted({n or default for n in grid["THREADS"]}
+                             | {os.cpu_count() or default})
+    devices = ["cpu"] + (["cuda:0"] if torch.cuda.is_available() else [])
+
+    combos = []
+    for path, fixed in sizes.items():
+        backend_grid = dict(grid, IMGSZ=[fixed]) if fixed else grid
+        path_combos = [{}]
+        for key in backend_grid:
+            path_combos = [dict(c, **{key: v}) for c in path_combos
+                           for v in backend_grid[key]]
+        combos += [dict(c, MODEL_PATH=path, DEVICE=dev)
+                   for dev in devices for c in path_combos]
+    return combos
+
+
+def measure(clip, settings, warmup=5):
+    """Rejoue ``clip`` avec ``settings`` : débit, latence et comptages."""
+    apply_settings(settings)
+    engine = CounterEngine()
+    engine.load_model(MODEL_PATH)
+    tracked = watch_tracked(engine)
+
+    latencies = []
+    for i, frame in enumerate(clip):
+        start = time.perf_counter()
+        engine.process(frame.copy())
+        if i >= warmup:
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "fps":     len(latencies) / max(sum(latencies), 1e-9),
+        "p50_ms":  latencies[len(latencies) // 2] * 1000,
+        "p95_ms":  latencies[int(len(latencies) * 0.95)] * 1000,
+        "counts":  {vtype: engine.counts[vtype] for vtype in VEHICLE_CLASSES.values()},
+        "tracked": dict(tracked),
+    }
+
+
+def agreement(result, reference):
+    """Accord (0–1) des comptages par classe avec la référence. Si la
+    référence compte trop peu de franchissements, on compare les boîtes
+    suivies cumulées."""
+    key = "counts"
+    if sum(reference["counts"].values()) < TUNE_MIN_CROSSINGS:
+        key = "tracked"
+    ref = reference[key]
+    total = sum(ref.values())
+    if total == 0:
+        return 1.0 if not any(result[key].values()) else 0.0
+    diff = sum(abs(result[key].get(k, 0) - ref.get(k, 0))
+               for k in VEHICLE_CLASSES.values())
+    return max(0.0, 1.0 - diff / total)
+
+
+def run_tune(source, profile_path=PROFILE_PATH, target_fps=TUNE_TARGET_FPS,
+             frames=TUNE_FRAMES):
+    """Balaye la grille sur un extrait de ``source`` et écrit le meilleur
+    réglage atteignant ``target_fps`` dans ``profile_path``."""
+    clip = read_clip(source, frames)
+    if len(clip) < 10:
+        print("❌ Extrait trop court ou source illisible !")
+        return 1
+
+    sizes = backend_sizes()
+    combos = tune_grid(sizes)
+    if not combos:
+        print(f"❌ Aucun modèle utilisable parmi {TUNE_BACKENDS}")
+        return 1
+
+    print(f"🎯 Cible {target_fps} FPS — {len(clip)} frames, {len(combos)} réglages")
+    # Référence de préférence sur un backend à taille libre (un export
+    # statique ignorerait l'IMGSZ de TUNE_REFERENCE) ; backend suivant si
+    # celui-ci échoue.
+    reference = None
+    for path in sorted(sizes, key=lambda p: sizes[p] is not None):
+        first = next(c for c in combos if c["MODEL_PATH"] == path)
+        ref_settings = dict(current_settings(), **TUNE_REFERENCE, MODEL_PATH=path,
+                            DEVICE=first["DEVICE"], THREADS=first["THREADS"])
+        ref_settings["IMGSZ"] = sizes[path] or ref_settings["IMGSZ"]
+        print(f"📏 Référence haute qualité : {path} imgsz={ref_settings['IMGSZ']} "
+              f"conf={ref_settings['CONF_THRESH']} iou={ref_settings['IOU_THRESH']}")
+        try:
+            reference = measure(clip, ref_settings)
+            break
+        except Exception as e:
+            print(f"   ❌ {e}")
+    if reference is None:
+        print("❌ Aucune référence mesurable — réglage abandonné.")
+        return 1
+    print(f"   comptages {reference['counts']}  ({reference['fps']:.1f} FPS)")
+
+    header = (f"{'modèle':<24} {'device':<7} {'imgsz':>5} {'conf':>5} {'iou':>5} "
+              f"{'thr':>4} {'FPS':>6} {'p50':>7} {'p95':>7} {'accord':>7}")
+    print(header)
+    trials = []
+    for settings in combos:
+        try:
+            result = measure(clip, settings)
+        except Exception as e:
+            print(f"{settings['MODEL_PATH']:<24} {settings['DEVICE']:<7} ❌ {e}")
+            continue
+        result["agreement"] = agreement(result, reference)
+        trials.append((settings, result))
+        print(f"{settings['MODEL_PATH']:<24} {settings['DEVICE']:<7} "
+              f"{settings['IMGSZ']:5d} {settings['CONF_THRESH']:5.2f} "
+              f"{settings['IOU_THRESH']:5.2f} {str(settings['THREADS'] or '-'):>4} "
+              f"{result['fps']:6.1f} {result['p50_ms']:7.1f} {result['p95_ms']:7.1f} "
+              f"{result['agreement']:7.1%}")
+
+    if not trials:
+        print("❌ Aucun réglage n'a pu être mesuré.")
+        return 1
+
+    fast = [t for t in trials if t[1]["fps"] >= target_fps]
+    if fast:
+        best = max(fast, key=lambda t: (t[1]["agreement"], t[1]["fps"]))
+    else:
+        best = max(trials, key=lambda t: t[1]["fps"])
+        print(f"⚠ Aucun réglage n'atteint {target_fps} FPS — on garde le plus rapide.")
+
+    settings, result = best
+    profile = {
+        "source":      str(source),
+        "created":     datetime.now().isoformat(timespec="seconds"),
+        "target_fps":  target_fps,
+        "meets_target": bool(fast),
+        "settings":    settings,
+        "metrics":     {k: v for k, v in result.items() if k != "tracked"},
+        "reference":   {"settings": ref_settings, "counts": reference["counts"]},
+    }
+    with open(profile_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+
+    print(f"✅ Profil écrit dans {profile_path} :", settings)
+    return 0
+
+
 # ═══════════════════════════════════════════════════════════
 #  APPLICATION PRINCIPALE
 # ═══════════════════════════════════════════════════════════
 class VehicleCounterApp:
-    def __init__(self, root):
+    def __init__(self, root, broadcaster=None, model=None):
         self.root = root
         self.root.title("🚗 Vehicle Counter — YOLO26s")
         self.root.configure(bg=BG)
@@ -71,20 +1276,16 @@ class VehicleCounterApp:
 
         # ── État ──
         self.running      = False
-        self.model        = None
+        self.engine       = CounterEngine(model)
+        self.broadcaster  = broadcaster
         self.cap          = None
-        self.counts       = defaultdict(int)
-        self.tracked_ids  = {}
-        self.crossed_ids  = set()
-        self.fps_history  = deque(maxlen=30)
+        self.ui_pending   = False
         self.count_history = {k: deque(maxlen=60) for k in VEHICLE_CLASSES.values()}
-        self.log_entries  = []
-        self.prev_time    = time.time()
-        self.current_fps  = 0.0
 
         # ── Build UI ──
         self._build_ui()
-        self._load_model()
+        if model is None:
+            self._load_model()
 
     # ───────────────────────────────────────────────────────
     #  BUILD UI
@@ -286,7 +1487,7 @@ class VehicleCounterApp:
 
         def load():
             try:
-                self.model = YOLO("yolo26s.pt")
+                self.engine.load_model()
                 self.root.after(0, lambda: self._log("✅ Modèle YOLO26s chargé !", "ok"))
                 self.root.after(0, lambda: self.status_label.config(
                     text="✅  PRÊT", fg="#00ff88"))
@@ -299,7 +1500,7 @@ class VehicleCounterApp:
     #  DÉMARRAGE / ARRÊT
     # ───────────────────────────────────────────────────────
     def _start(self):
-        if self.model is None:
+        if self.engine.model is None:
             self._log("⚠ Modèle pas encore chargé, patiente...", "time")
             return
 
@@ -328,10 +1529,7 @@ class VehicleCounterApp:
 
     def _reset(self):
         self._stop()
-        self.counts.clear()
-        self.tracked_ids.clear()
-        self.crossed_ids.clear()
-        self.fps_history.clear()
+        self.engine.reset()
         for q in self.count_history.values():
             q.clear()
         self._clear_log()
@@ -342,84 +1540,26 @@ class VehicleCounterApp:
     #  BOUCLE DE DÉTECTION
     # ───────────────────────────────────────────────────────
     def _detect_loop(self):
-        self.prev_time = time.time()
+        self.engine.prev_time = time.time()
 
         while self.running:
             ret, frame = self.cap.read()
             if not ret:
                 break
 
-            h, w = frame.shape[:2]
-            line_y = int(h * LINE_RATIO)
-
-            # ── Inférence YOLO ──
-            results = self.model.track(
-                frame,
-                persist=True,
-                conf=CONF_THRESH,
-                iou=0.45,
-                imgsz=IMGSZ,
-                classes=list(VEHICLE_CLASSES.keys()),
-                verbose=False
-            )
-
-            if (results[0].boxes is not None
-                    and results[0].boxes.id is not None):
-                boxes   = results[0].boxes.xyxy.cpu().numpy()
-                ids     = results[0].boxes.id.cpu().numpy().astype(int)
-                classes = results[0].boxes.cls.cpu().numpy().astype(int)
-                confs   = results[0].boxes.conf.cpu().numpy()
-
-                for box, tid, cls_id, conf in zip(boxes, ids, classes, confs):
-                    label = VEHICLE_CLASSES.get(cls_id)
-                    if not label:
-                        continue
-
-                    color = COLORS_BGR[label]
-                    x1, y1, x2, y2 = map(int, box)
-                    cx, cy = (x1+x2)//2, int(y2)
-
-                    # Franchissement ligne
-                    side = "above" if cy < line_y else "below"
-                    if tid not in self.tracked_ids:
-                        self.tracked_ids[tid] = side
-                    else:
-                        if (self.tracked_ids[tid] != side
-                                and tid not in self.crossed_ids):
-                            self.counts[label] += 1
-                            self.crossed_ids.add(tid)
-                            msg = f"{ICONS[label]} {label} #{tid} → Total : {self.counts[label]}"
-                            self.root.after(0, lambda m=msg, l=label: self._log(m, l))
-                        self.tracked_ids[tid] = side
-
-                    # Dessin bbox
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    tag = f"{label} #{tid}  {conf:.0%}"
-                    (tw, th), _ = cv2.getTextSize(tag, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                    cv2.rectangle(frame, (x1, y1-th-8), (x1+tw+6, y1), color, -1)
-                    cv2.putText(frame, tag, (x1+3, y1-4),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 1, cv2.LINE_AA)
-                    cv2.circle(frame, (cx, cy), 4, color, -1)
-
-            # Ligne de comptage
-            cv2.line(frame, (0, line_y), (w, line_y), (0, 60, 255), 2)
-            cv2.putText(frame, "COUNTING LINE", (w//2-80, line_y-8),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 80, 255), 1, cv2.LINE_AA)
-
-            # FPS
-            now = time.time()
-            fps = 1.0 / max(now - self.prev_time, 1e-6)
-            self.prev_time = now
-            self.current_fps = fps
-            self.fps_history.append(fps)
-
-            cv2.putText(frame, f"FPS: {fps:.1f}", (12, 28),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,136), 2, cv2.LINE_AA)
-
-            # Mettre à jour l'UI dans le thread principal
-            self.root.after(0, lambda f=frame.copy(): self._update_frame(f))
-            self.root.after(0, self._update_metrics)
-            self.root.after(0, self._draw_fps_graph)
+            for label, tid, total in self.engine.process(frame):
+                msg = crossing_message(label, tid, total)
+                self.root.after(0, lambda m=msg, l=label: self._log(m, l))
+
+            if self.broadcaster:
+                self.broadcaster.publish(frame, self.engine.stats())
+
+            # Mettre à jour l'UI dans le thread principal — un seul
+            # rafraîchissement en attente : si Tk prend du retard, on saute
+            # des frames au lieu d'empiler les callbacks
+            if not self.ui_pending:
+                self.ui_pending = True
+                self.root.after(0, lambda f=frame.copy(): self._refresh_ui(f))
 
         self.root.after(0, lambda: self.video_label.config(
             text="📷\nCaméra arrêtée", image="", compound="center"))
@@ -427,6 +1567,15 @@ class VehicleCounterApp:
     # ───────────────────────────────────────────────────────
     #  MISE À JOUR AFFICHAGE
     # ───────────────────────────────────────────────────────
+    def _refresh_ui(self, frame):
+        self.ui_pending = False
+        self._update_frame(frame)
+        self._update_metrics()
+        self._draw_fps_graph()
+
+    def log_lines(self):
+        return int(self.log_text.index("end-1c").split(".")[0]) - 1
+
     def _update_frame(self, frame):
         """Affiche le frame OpenCV dans le Label Tkinter."""
         lbl_w = self.video_label.winfo_width()
@@ -444,11 +1593,12 @@ class VehicleCounterApp:
         self.video_label.image = img
 
     def _update_metrics(self):
-        total = sum(self.counts.values())
+        counts = self.engine.counts
+        total = sum(counts.values())
         self.total_label.config(text=str(total))
 
         for vtype in ["Car", "Motorcycle", "Bus", "Truck"]:
-            v = self.counts[vtype]
+            v = counts[vtype]
             self.count_labels[vtype].config(text=str(v))
 
             # Barre
@@ -459,7 +1609,7 @@ class VehicleCounterApp:
             # Historique
             self.count_history[vtype].append(v)
 
-        fps = self.current_fps
+        fps = self.engine.current_fps
         col = "#00ff88" if fps >= 15 else "#ff9500" if fps >= 8 else "#ff3b5c"
         self.fps_label.config(
             text=f"{fps:.1f} FPS" if fps > 0 else "— FPS", fg=col)
@@ -472,7 +1622,7 @@ class VehicleCounterApp:
         if W < 2:
             return
 
-        data = list(self.fps_history)
+        data = list(self.engine.fps_history)
         if len(data) < 2:
             return
 
@@ -521,6 +1671,7 @@ class VehicleCounterApp:
         now = datetime.now().strftime("%H:%M:%S")
         self.log_text.config(state="normal")
         self.log_text.insert("1.0", f"[{now}]  {msg}\n", tag)
+        self.log_text.delete(f"{LOG_MAX_LINES + 1}.0", "end")
         self.log_text.config(state="disabled")
 
     def _clear_log(self):
@@ -529,14 +1680,15 @@ class VehicleCounterApp:
         self.log_text.config(state="disabled")
 
     def _print_summary(self):
-        total = sum(self.counts.values())
+        counts = self.engine.counts
+        total = sum(counts.values())
         lines = [
             "─" * 36,
             "  📊 RÉSUMÉ FINAL",
             "─" * 36,
         ]
         for vtype in ["Car", "Motorcycle", "Bus", "Truck"]:
-            lines.append(f"  {ICONS[vtype]} {vtype:<14} : {self.counts[vtype]}")
+            lines.append(f"  {ICONS[vtype]} {vtype:<14} : {counts[vtype]}")
         lines += [f"  {'TOTAL':<16} : {total}", "─" * 36]
         for line in lines:
             self._log(line, "time")
@@ -707,7 +1859,47 @@ class SplashScreen:
 # ═══════════════════════════════════════════════════════════
 #  MAIN
 # ═══════════════════════════════════════════════════════════
-def main():
+def run_headless(source, server=None):
+    """Boucle de comptage sans Tkinter (journal sur la console)."""
+    engine = CounterEngine()
+    print("Chargement de YOLO26s...")
+    engine.load_model()
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print("❌ Impossible d'ouvrir la caméra !")
+        return
+
+    print("▶ Détection démarrée — Ctrl+C pour arrêter.")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            for label, tid, total in engine.process(frame):
+                stamp = datetime.now().strftime("%H:%M:%S")
+                print(f"[{stamp}]  {crossing_message(label, tid, total)}")
+            if server:
+                server.broadcaster.publish(frame, engine.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        print("⏹ Détection arrêtée.")
+        print(json.dumps(engine.stats(), indent=2))
+
+
+def import_gui():
+    """Tkinter et PIL.ImageTk ne sont chargés que pour l'interface :
+    le mode headless doit tourner sur un serveur sans Tk."""
+    global tk, ttk, font, Image, ImageTk
+    import tkinter as tk
+    from tkinter import ttk, font
+    from PIL import Image, ImageTk
+
+
+def run_gui(server=None):
+    import_gui()
     root = tk.Tk()
     root.withdraw()   # Cache la fenêtre principale pendant le splash
 
@@ -716,7 +1908,7 @@ def main():
     def launch():
         root.deiconify()
         nonlocal app
-        app = VehicleCounterApp(root)
+        app = VehicleCounterApp(root, server.broadcaster if server else None)
 
         # Bouton "Command Line ?" dans la barre de menu
         menu = tk.Menu(root)
@@ -734,5 +1926,110 @@ def main():
     root.mainloop()
 
 
+def parse_layout(text):
+    cols, _, rows = text.lower().partition("x")
+    try:
+        cols, rows = int(cols), int(rows or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"disposition invalide : {text!r} (ex. 3x2)")
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"au moins 1 colonne et 1 ligne : {text!r}")
+    return cols, rows
+
+
+def parse_region(text):
+    top, _, bottom = text.partition(":")
+    try:
+        top, bottom = float(top), float(bottom)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bande invalide : {text!r} (ex. 0.3:0.9)")
+    if not 0 <= top < bottom <= 1:
+        raise argparse.ArgumentTypeError(
+            f"bande invalide : {text!r} (il faut 0 <= haut < bas <= 1)")
+    return top, bottom
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Vehicle Counter — YOLO26s")
+    parser.add_argument("--source", default=SOURCE,
+                        help="index webcam, fichier vidéo ou URL RTSP")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="expose le flux MJPEG et les stats sur ce port")
+    parser.add_argument("--host", default=HTTP_HOST,
+                        help="adresse d'écoute du serveur HTTP (0.0.0.0 pour "
+                             "l'ouvrir au réseau — sans authentification)")
+    parser.add_argument("--headless", action="store_true",
+                        help="sans interface Tkinter")
+    parser.add_argument("--tiles", type=parse_layout, default=TILES, metavar="CxL",
+                        help="inférence par tuiles, ex. 3x2 (colonnes x lignes)")
+    parser.add_argument("--tile-region", type=parse_region, default=TILE_REGION,
+                        metavar="HAUT:BAS", help="limite les tuiles à une bande "
+                        "verticale, ex. 0.3:0.9 autour de la ligne de comptage "
+                        "(seule : une tuile 1x1 sur la bande)")
+    parser.add_argument("--tile-bench", action="store_true",
+                        help="mesure le coût de chaque disposition de tuiles")
+    parser.add_argument("--profile", default=PROFILE_PATH, metavar="FICHIER",
+                        help="profil de réglages (lu au démarrage, écrit par --tune)")
+    parser.add_argument("--tune", action="store_true",
+                        help="cherche les meilleurs réglages pour cette source")
+    parser.add_argument("--target-fps", type=float, default=TUNE_TARGET_FPS,
+                        help="FPS minimal visé par --tune")
+    parser.add_argument("--tune-frames", type=int, default=TUNE_FRAMES,
+                        help="nombre de frames de l'extrait utilisé par --tune")
+    parser.add_argument("--soak", type=float, metavar="HEURES",
+                        help="test d'endurance sur HEURES heures simulées "
+                             "(trafic synthétique, sans modèle ni caméra)")
+    parser.add_argument("--soak-gui", action="store_true",
+                        help="--soak via le vrai dashboard Tkinter (affichage requis)")
+    args = parser.parse_args(argv)
+    if isinstance(args.source, str) and args.source.isdigit():
+        args.source = int(args.source)
+    return args
+
+
+def main(argv=None):
+    global SOURCE, TILES, TILE_REGION
+    args = parse_args(argv)
+    SOURCE = args.source
+    TILES, TILE_REGION = args.tiles, args.tile_region
+    if TILE_REGION and not TILES:
+        TILES = (1, 1)      # une seule tuile : la bande de comptage entière
+    if TILE_REGION and not TILE_REGION[0] <= LINE_RATIO <= TILE_REGION[1]:
+        print(f"⚠ La bande {TILE_REGION[0]:g}:{TILE_REGION[1]:g} ne contient pas "
+              f"la ligne de comptage ({LINE_RATIO:g}) : aucun véhicule ne sera compté.")
+
+    if args.tune:
+        raise SystemExit(run_tune(SOURCE, args.profile, args.target_fps,
+                                  args.tune_frames))
+
+    # Le soak tourne sur un détecteur factice : le profil ne le concerne pas
+    if args.soak is None:
+        settings = load_profile(args.profile)
+        if settings:
+            print(f"⚙ Profil {args.profile} chargé :", settings)
+
+    if args.tile_bench:
+        raise SystemExit(bench_tiles(SOURCE, region=TILE_REGION))
+
+    server = None
+    if args.serve is not None:
+        server = StreamServer(args.serve, args.host).start()
+        print(f"🌐 Flux disponible sur {server.url}")
+        if args.host not in ("127.0.0.1", "localhost", "::1"):
+            print(f"⚠ Serveur ouvert sur {args.host} sans authentification : "
+                  f"toute machine du réseau peut voir la caméra.")
+
+    try:
+        if args.soak is not None:
+            raise SystemExit(run_soak(args.soak, server, args.soak_gui))
+        if args.headless:
+            run_headless(SOURCE, server)
+        else:
+            run_gui(server)
+    finally:
+        if server:
+            server.stop()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file